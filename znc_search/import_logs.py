@@ -6,8 +6,16 @@ Import ZNC logs into MySQL database
 import os
 import sys
 import re
+import collections
+import functools
+import itertools
+import multiprocessing
+import queue
+import tempfile
+import threading
 from datetime import datetime
 import mysql.connector
+from mysql.connector import errorcode
 from mysql.connector import pooling
 import argparse
 from dotenv import load_dotenv
@@ -25,9 +33,51 @@ MYSQL_USER = os.getenv('MYSQL_USER', 'root')
 MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '')
 MYSQL_DATABASE = os.getenv('MYSQL_DATABASE', 'znc_logs')
 
+# Shared cache of the web app, flushed after new lines are imported
+REDIS_URL = os.getenv('REDIS_URL')
+WEB_CACHE_PREFIX = 'znc_search:cache:'
+
 # Batch size for bulk inserts
 BATCH_SIZE = 5000
 
+INSERT_LOG_SQL = (
+    'INSERT INTO log_entries '
+    '(network_id, channel_name, log_date, line_number, content) '
+    'VALUES (%s, %s, %s, %s, %s)'
+)
+
+LOAD_LOG_SQL = (
+    'LOAD DATA LOCAL INFILE %s INTO TABLE log_entries '
+    "CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' "
+    '(network_id, channel_name, log_date, line_number, content)'
+)
+
+# Errors meaning the server or client refuses LOAD DATA LOCAL INFILE
+LOCAL_INFILE_ERRORS = {
+    errorcode.ER_NOT_ALLOWED_COMMAND,
+    getattr(errorcode, 'ER_CLIENT_LOCAL_FILES_DISABLED', 3948),
+    getattr(errorcode, 'CR_LOAD_DATA_LOCAL_INFILE_REJECTED', 2068),
+}
+
+# Escape the characters LOAD DATA treats specially in a field
+_TSV_ESCAPE = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n'})
+
+# Cleared on the first rejection so later files go straight to executemany
+_use_local_infile = True
+
+# Indexes on log_entries the importer and web app rely on, keyed by name.
+# A missing index is only created when no existing index starts with the
+# same columns; a column may carry a DESC sort direction.
+LOG_INDEXES = {
+    # Importer date scan and the /api/context line window
+    'ix_le_net_chan_date_line': ('network_id', 'channel_name', 'log_date', 'line_number'),
+    # /api/search ORDER BY log_date DESC, line_number ASC within a network
+    'ix_le_net_date': ('network_id', 'log_date DESC', 'line_number'),
+}
+
+# FULLTEXT index the web app searches content through
+FULLTEXT_INDEX = 'ft_content_ngram'
+
 
 SKIP_PREFIXES = (
     '*** Joins:',
@@ -40,29 +90,33 @@ SKIP_PREFIXES = (
     '*** ChanServ sets',
 )
 
-SKIP_NICKS = {
+SKIP_NICKS = frozenset({
     'chanserv', 'nickserv', 'hostserv', 'memoserv', 'operserv', 'global'
-}
+})
+
+_TS_RE = re.compile(r'^\[\d{2}:\d{2}:\d{2}\]\s*')
+_NICK_RE = re.compile(r'^[<*]\s*([A-Za-z0-9_\-\[\]\\`^{}|]+)[>*]?\s', re.ASCII)
+
+# Bold, reset, reverse, italic and underline are single bytes; colors take args
+_CTRL_TABLE = str.maketrans('', '', '\x02\x0F\x16\x1D\x1F')
+_COLOR_RE = re.compile(r'\x03(?:\d{1,2}(?:,\d{1,2})?)?')
+
 
 def should_skip(line):
     """Return True if line should not be stored"""
-    # Strip timestamp if present e.g. [08:25:58] 
-    stripped = re.sub(r'^\[\d{2}:\d{2}:\d{2}\]\s*', '', line)
+    # Strip timestamp if present e.g. [08:25:58]
+    m = _TS_RE.match(line)
+    stripped = line[m.end():] if m else line
 
-    # Skip server/status messages
-    for prefix in SKIP_PREFIXES:
-        if stripped.startswith(prefix):
-            return True
-
-    # Skip mode changes and kicks
+    # Skip server/status messages, mode changes and kicks.
+    # Every entry in SKIP_PREFIXES starts with '*** ', so this covers them too.
     if stripped.startswith('*** '):
         return True
 
     # Skip service bots by nick - matches "<NickServ> ..." format
-    nick_match = re.match(r'^[<*]\s*([A-Za-z0-9_\-\[\]\\`^{}|]+)[>*]?\s', stripped)
-    if nick_match:
-        nick = nick_match.group(1).lower()
-        if nick in SKIP_NICKS:
+    if stripped[:1] in ('<', '*'):
+        nick_match = _NICK_RE.match(stripped)
+        if nick_match and nick_match.group(1).casefold() in SKIP_NICKS:
             return True
 
     return False
@@ -70,9 +124,10 @@ def should_skip(line):
 
 def strip_irc_formatting(text):
     """Remove IRC color codes and formatting characters"""
-    text = re.sub(r'\x03(?:\d{1,2}(?:,\d{1,2})?)?', '', text)
-    text = re.sub(r'[\x02\x1D\x1F\x16\x0F]', '', text)
-    return text
+    # Most lines carry no colors; skip the regex walk for them entirely
+    if '\x03' in text:
+        text = _COLOR_RE.sub('', text)
+    return text.translate(_CTRL_TABLE)
 
 
 def get_db():
@@ -84,23 +139,149 @@ def get_db():
         password=MYSQL_PASSWORD,
         database=MYSQL_DATABASE,
         charset='utf8mb4',
-        collation='utf8mb4_unicode_ci'
+        collation='utf8mb4_unicode_ci',
+        allow_local_infile=True,
+        use_pure=False,
+        compress=True,
+        autocommit=False
+    )
+
+
+def get_log_indexes(cursor):
+    """Return {index_name: ((column, ...), droppable)} for the log_entries table
+
+    droppable is True for plain (non-unique B-tree) secondary indexes.
+    """
+    cursor.execute(
+        'SELECT index_name, column_name, non_unique, index_type '
+        'FROM information_schema.statistics '
+        'WHERE table_schema = DATABASE() AND table_name = %s '
+        'ORDER BY index_name, seq_in_index',
+        ('log_entries',)
     )
+    indexes = {}
+    for index_name, column_name, non_unique, index_type in cursor.fetchall():
+        columns = indexes.get(index_name, ((), False))[0] + (column_name,)
+        indexes[index_name] = (columns, bool(non_unique) and index_type == 'BTREE')
+    return indexes
 
 
-def init_db():
-    """Initialize default admin user if not exists"""
-    import hashlib
+def get_fulltext_indexes(cursor):
+    """Return the names of the FULLTEXT indexes on log_entries.content"""
+    cursor.execute(
+        'SELECT DISTINCT index_name FROM information_schema.statistics '
+        "WHERE table_schema = DATABASE() AND table_name = %s "
+        "AND index_type = 'FULLTEXT' AND column_name = 'content'",
+        ('log_entries',)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def create_log_indexes(cursor, build_indexes=False, build_fulltext=False):
+    """Create missing LOG_INDEXES entries and the ngram FULLTEXT index, if asked
+
+    An index is only created when no existing index starts with the same
+    columns. ngram tokens cover phrases, URLs and punctuation that the
+    default word parser cannot match, so one FULLTEXT index serves every
+    search. Building an index scans the whole table, so on a populated one
+    that only happens when build_indexes or build_fulltext is set;
+    otherwise a missing index is just reported.
+    """
+    indexes = get_log_indexes(cursor)
+
+    for name, spec in LOG_INDEXES.items():
+        columns = tuple(column.split()[0] for column in spec)
+        if any(cols[:len(columns)] == columns for cols, _ in indexes.values()):
+            continue
+        if not build_indexes:
+            print(f"Note: index {name} on log_entries ({', '.join(spec)}) is missing; "
+                  "run with --build-indexes to create it")
+            continue
+        print(f"Creating index {name} on log_entries ({', '.join(spec)})...")
+        cursor.execute(f"CREATE INDEX {name} ON log_entries ({', '.join(spec)})")
+        indexes[name] = (columns, True)
+
+    if FULLTEXT_INDEX not in get_fulltext_indexes(cursor):
+        if not build_fulltext:
+            print(f"Note: FULLTEXT index {FULLTEXT_INDEX} is missing; "
+                  "run with --rebuild-fulltext to build it")
+            return
+        print(f"Creating FULLTEXT index {FULLTEXT_INDEX} on log_entries (content)...")
+        # With stopwords on, every ngram containing one (e.g. 'a') is skipped
+        cursor.execute('SET SESSION innodb_ft_enable_stopword = 0')
+        cursor.execute(f'CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON log_entries (content) WITH PARSER ngram')
+
+
+def drop_redundant_indexes(cursor, drop_fulltext=False, include_planned=False):
+    """Drop indexes that only add write overhead
+
+    A plain index whose columns are a leading prefix of another index is
+    dropped; with include_planned, so is one covered by a LOG_INDEXES entry
+    create_log_indexes is about to add. Other FULLTEXT indexes on content
+    are dropped once the ngram one exists, or when drop_fulltext says it is
+    about to be built.
+    """
+    indexes = get_log_indexes(cursor)
+    targets = [cols for cols, _ in indexes.values()]
+    if include_planned:
+        targets += [tuple(column.split()[0] for column in spec) for spec in LOG_INDEXES.values()]
+
+    for name, (columns, droppable) in indexes.items():
+        if not droppable:
+            continue
+        if any(len(cols) > len(columns) and cols[:len(columns)] == columns for cols in targets):
+            print(f"Dropping redundant index {name} on log_entries ({', '.join(columns)})...")
+            cursor.execute(f"DROP INDEX {name} ON log_entries")
+
+    fulltext = get_fulltext_indexes(cursor)
+    if drop_fulltext or FULLTEXT_INDEX in fulltext:
+        for name in sorted(fulltext - {FULLTEXT_INDEX}):
+            print(f"Dropping FULLTEXT index {name} on log_entries (content)...")
+            cursor.execute(f"DROP INDEX {name} ON log_entries")
+
+
+def ensure_indexes(cursor, build_indexes=False, build_fulltext=False):
+    """Bring log_entries indexes in line with LOG_INDEXES and FULLTEXT_INDEX
+
+    New indexes are built before the ones they replace are dropped, so
+    searches on a populated table never run without an index.
+    """
+    create_log_indexes(cursor, build_indexes, build_fulltext)
+    drop_redundant_indexes(cursor, drop_fulltext=build_fulltext)
+
+
+def clear_web_cache():
+    """Drop the web app's cached network, channel and stats listings
+
+    Best effort: the listings expire on their own, so an unreachable Redis
+    only prints a warning.
+    """
+    if not REDIS_URL:
+        return
+    import redis
+    try:
+        client = redis.Redis.from_url(REDIS_URL)
+        keys = list(client.scan_iter(match=WEB_CACHE_PREFIX + '*', count=1000))
+        if keys:
+            client.delete(*keys)
+    except redis.exceptions.RedisError as e:
+        print(f"  ⚠ Could not clear the web cache: {e}")
+
+
+def init_db(create_indexes=True, build_indexes=False, build_fulltext=False):
+    """Initialize default admin user and log_entries indexes if not exists"""
+    from passwords import hash_password
     conn = get_db()
     cursor = conn.cursor()
 
-    cursor.execute('SELECT COUNT(*) FROM users WHERE username = %s', ('admin',))
-    if cursor.fetchone()[0] == 0:
-        default_hash = hashlib.sha256('admin'.encode()).hexdigest()
-        cursor.execute(
-            'INSERT INTO users (username, password_hash, totp_enabled) VALUES (%s, %s, 0)',
-            ('admin', default_hash)
-        )
+    if create_indexes:
+        ensure_indexes(cursor, build_indexes, build_fulltext)
+
+    cursor.execute(
+        'INSERT IGNORE INTO users (username, password_hash, totp_enabled) VALUES (%s, %s, 0)',
+        ('admin', hash_password('admin'))
+    )
+    if cursor.rowcount:
         conn.commit()
         print("WARNING: Default admin user created with password 'admin'. Please change it immediately!")
 
@@ -108,26 +289,253 @@ def init_db():
     conn.close()
 
 
+@functools.lru_cache(maxsize=None)
 def parse_log_date(filename):
-    """Parse date from log filename"""
+    """Parse date from log filename (YYYY-MM-DD.log or name_YYYYMMDD.log)"""
     date_str = filename.replace('.log', '')
 
+    # The usual zero-padded shapes are sliced directly instead of letting
+    # strptime raise
     try:
-        return datetime.strptime(date_str, '%Y-%m-%d')
-    except ValueError:
-        pass
+        if (len(date_str) == 10 and date_str[4] == date_str[7] == '-'
+                and (date_str[:4] + date_str[5:7] + date_str[8:]).isdigit()):
+            return datetime(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:]))
 
-    try:
-        date_str = date_str.split('_')[-1]
-        return datetime.strptime(date_str, '%Y%m%d')
+        tail = date_str.rsplit('_', 1)[-1]
+        if len(tail) == 8 and tail.isdigit():
+            return datetime(int(tail[:4]), int(tail[4:6]), int(tail[6:]))
     except ValueError:
         pass
 
+    # Anything else (e.g. 2024-1-5.log, which strptime accepts) goes through
+    # the strptime formats
+    for value, fmt in ((date_str, '%Y-%m-%d'), (date_str.split('_')[-1], '%Y%m%d')):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+
     return None
 
 
-def import_network(conn, network_id, force=False):
-    """Import logs for a single network"""
+def read_log_rows(file_path, network_id, channel_name, date_str, strip_formatting=True):
+    """Yield log_entries rows for the lines of a log file worth storing"""
+    # Bind the per-line helpers to locals for the hot loop
+    skip = should_skip
+    strip = strip_irc_formatting if strip_formatting else None
+    rstrip = str.rstrip
+
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line_number, line in enumerate(f, 1):
+            if skip(line):
+                continue
+            content = rstrip(line)
+            yield (network_id, channel_name, date_str, line_number,
+                   strip(content) if strip else content)
+
+
+def read_channel_rows(network_id, channel_name, pending, counts, strip_formatting=True):
+    """Yield the rows of every pending log file of a channel as one stream
+
+    (log_file, row_count) is appended to counts as each file finishes.
+    """
+    for log_file, file_path, date_str in pending:
+        row_count = 0
+        for row in read_log_rows(file_path, network_id, channel_name, date_str,
+                                 strip_formatting):
+            row_count += 1
+            yield row
+        counts.append((log_file, row_count))
+
+
+def prefetch_batches(rows, size=BATCH_SIZE, depth=2):
+    """Yield lists of up to `size` rows, built ahead on a reader thread
+
+    The queue holds at most `depth` batches, so reading and parsing the
+    next batch overlaps with sending the current one to MySQL without
+    letting memory grow with the file.
+    """
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def reader():
+        try:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= size:
+                    if not put(batch):
+                        return
+                    batch = []
+            if batch and not put(batch):
+                return
+            put(done)
+        except Exception as e:
+            put(e)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def insert_rows(cursor, rows):
+    """Insert rows with executemany in BATCH_SIZE batches, return the count"""
+    inserted = 0
+    for batch in prefetch_batches(rows):
+        cursor.executemany(INSERT_LOG_SQL, batch)
+        inserted += len(batch)
+    return inserted
+
+
+def write_tsv(rows, tmp_dir=None):
+    """Write rows to a temporary TSV file for LOAD DATA and return its path"""
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='',
+                                     suffix='.tsv', dir=tmp_dir, delete=False) as tmp:
+        try:
+            for row in rows:
+                tmp.write('\t'.join(str(v).translate(_TSV_ESCAPE) for v in row))
+                tmp.write('\n')
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    return tmp.name
+
+
+def load_tsv(cursor, tsv_path):
+    """Bulk load a TSV file written by write_tsv, return the row count"""
+    cursor.execute(LOAD_LOG_SQL, (tsv_path,))
+    return cursor.rowcount
+
+
+def write_channel_tsv(job):
+    """Parse a channel's pending log files into one TSV file (pool worker)
+
+    job is (network_id, channel_name, [(log_file, file_path, date_str), ...],
+    strip_formatting, tmp_dir); returns (tsv_path, [(log_file, row_count), ...]),
+    or (None, []) when there is nothing to import.
+    """
+    network_id, channel_name, pending, strip_formatting, tmp_dir = job
+    if not pending:
+        return None, []
+
+    counts = []
+    tsv_path = write_tsv(
+        read_channel_rows(network_id, channel_name, pending, counts, strip_formatting),
+        tmp_dir
+    )
+    return tsv_path, counts
+
+
+def run_ahead(pool, func, jobs, depth):
+    """Yield func(job) for each job in order, computed on the pool
+
+    A job that raises yields its exception instead, so one failure does not
+    end the generator for the jobs after it. At most `depth` jobs are queued
+    or running at once, so workers cannot get further ahead of the consumer
+    than that. Without a pool the jobs run lazily in this process.
+    """
+    if pool is None:
+        for job in jobs:
+            try:
+                result = func(job)
+            except Exception as e:
+                result = e
+            yield result
+        return
+
+    jobs = iter(jobs)
+    in_flight = collections.deque(
+        pool.apply_async(func, (job,)) for job in itertools.islice(jobs, depth)
+    )
+    while in_flight:
+        try:
+            result = in_flight.popleft().get()
+        except Exception as e:
+            result = e
+        for job in itertools.islice(jobs, 1):
+            in_flight.append(pool.apply_async(func, (job,)))
+        yield result
+
+
+def scan_channels(cursor, network_id, log_base, force=False):
+    """List channels with their log files, split into skipped and pending
+
+    Returns [(channel_name, skipped_files, pending_files), ...] where
+    pending_files holds (log_file, file_path, date_str) tuples.
+    """
+    with os.scandir(log_base) as it:
+        channel_entries = sorted(it, key=lambda e: e.name)
+
+    # Fetch every already-imported (channel, date) of the network in one query
+    imported = set()
+    if not force:
+        cursor.execute(
+            'SELECT DISTINCT channel_name, log_date FROM log_entries WHERE network_id = %s',
+            (network_id,)
+        )
+        imported = {(row[0], str(row[1])) for row in cursor.fetchall()}
+
+    channels = []
+    for channel_entry in channel_entries:
+        if not channel_entry.is_dir():
+            continue
+
+        channel_name = channel_entry.name
+
+        # Parse every filename up front so undated files are never opened
+        with os.scandir(channel_entry.path) as it:
+            log_files = [
+                (e, parse_log_date(e.name)) for e in it
+                if e.name.endswith('.log') and e.is_file()
+            ]
+        log_files = sorted(((e, d) for e, d in log_files if d is not None),
+                           key=lambda item: item[0].name)
+
+        skipped = []
+        pending = []
+        for log_entry, log_date in log_files:
+            date_str = log_date.strftime('%Y-%m-%d')
+            if (channel_name, date_str) in imported:
+                skipped.append(log_entry.name)
+            elif log_entry.stat().st_size:
+                pending.append((log_entry.name, log_entry.path, date_str))
+
+        channels.append((channel_name, skipped, pending))
+
+    return channels
+
+
+def import_network(conn, network_id, force=False, pool=None,
+                   strip_formatting=True, debug=False, tmp_dir=None, jobs_ahead=2):
+    """Import logs for a single network
+
+    When a multiprocessing pool is given, each channel is parsed into a TSV
+    file in tmp_dir by the workers while the main process loads earlier
+    channels, with at most jobs_ahead channels parsed ahead of the loader.
+    With debug, every skipped and imported file is listed.
+    """
+    global _use_local_infile
     cursor = conn.cursor()
 
     display_name = network_id.capitalize()
@@ -144,85 +552,108 @@ def import_network(conn, network_id, force=False):
         print(f"  ⚠ Log directory not found: {log_base}")
         return 0
 
+    conn.commit()
+
     print(f"Importing network: {network_id} ({display_name})")
     total_imported = 0
 
-    for channel_name in sorted(os.listdir(log_base)):
-        channel_path = os.path.join(log_base, channel_name)
-
-        if not os.path.isdir(channel_path):
-            continue
-
-        print(f"  Processing channel: {channel_name}")
+    channels = scan_channels(cursor, network_id, log_base, force)
 
-        cursor.execute(
-            'INSERT IGNORE INTO channels (network_id, name) VALUES (%s, %s)',
-            (network_id, channel_name)
-        )
-
-        log_files = sorted([f for f in os.listdir(channel_path) if f.endswith('.log')])
+    # Channels known from earlier runs need no INSERT IGNORE round trip
+    cursor.execute('SELECT name FROM channels WHERE network_id = %s', (network_id,))
+    seen_channels = {row[0] for row in cursor.fetchall()}
 
-        for log_file in log_files:
-            log_date = parse_log_date(log_file)
+    # Workers run a bounded distance ahead of the loop below, in channel order
+    tsv_results = None
+    if _use_local_infile:
+        jobs = [(network_id, channel_name, pending, strip_formatting, tmp_dir)
+                for channel_name, _, pending in channels]
+        tsv_results = run_ahead(pool, write_channel_tsv, jobs, jobs_ahead)
 
-            if not log_date:
-                continue
-
-            file_path = os.path.join(channel_path, log_file)
-            date_str = log_date.strftime('%Y-%m-%d')
+    # Each channel is loaded in one transaction; skip per-row uniqueness and
+    # foreign key checks for the bulk load and restore them afterwards
+    cursor.execute('SET SESSION unique_checks = 0, foreign_key_checks = 0')
+    try:
+        for channel_name, skipped, pending in channels:
+            print(f"  Processing channel: {channel_name}")
 
-            # Check if already imported
-            if not force:
-                cursor.execute(
-                    'SELECT COUNT(*) FROM log_entries '
-                    'WHERE network_id = %s AND channel_name = %s AND log_date = %s',
-                    (network_id, channel_name, date_str)
-                )
-                if cursor.fetchone()[0] > 0:
+            if debug:
+                for log_file in skipped:
                     print(f"    ⊘ {log_file}: already imported")
-                    continue
+            elif skipped:
+                print(f"    ⊘ {len(skipped)} file(s) already imported")
 
+            tsv_path = None
             try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    lines = f.readlines()
-
-                if not lines:
-                    continue
-
-                entries = [
-                    (network_id, channel_name, date_str, i + 1, strip_irc_formatting(line.rstrip()))
-                    for i, line in enumerate(lines)
-                    if not should_skip(line)
-                ]
-
-                # Insert in batches
-                rows_inserted = 0
-                for i in range(0, len(entries), BATCH_SIZE):
-                    batch = entries[i:i + BATCH_SIZE]
-                    cursor.executemany(
-                        'INSERT INTO log_entries '
-                        '(network_id, channel_name, log_date, line_number, content) '
-                        'VALUES (%s, %s, %s, %s, %s)',
-                        batch
+                counts = []
+                if tsv_results is not None:
+                    result = next(tsv_results)
+                    if isinstance(result, Exception):
+                        raise result
+                    tsv_path, counts = result
+
+                if channel_name not in seen_channels:
+                    cursor.execute(
+                        'INSERT IGNORE INTO channels (network_id, name) VALUES (%s, %s)',
+                        (network_id, channel_name)
                     )
-                    rows_inserted += len(batch)
+
+                # The whole channel goes to MySQL as one LOAD DATA, or as
+                # BATCH_SIZE inserts that span file boundaries
+                loaded = False
+                if tsv_path and _use_local_infile:
+                    try:
+                        load_tsv(cursor, tsv_path)
+                        loaded = True
+                    except mysql.connector.Error as e:
+                        if e.errno not in LOCAL_INFILE_ERRORS:
+                            raise
+                        print(f"    ⚠ LOAD DATA LOCAL INFILE rejected ({e}), using INSERT batches")
+                        _use_local_infile = False
+
+                if not loaded and pending:
+                    counts = []
+                    insert_rows(cursor, read_channel_rows(network_id, channel_name, pending,
+                                                          counts, strip_formatting))
 
                 conn.commit()
-                total_imported += rows_inserted
-                print(f"    ✓ {log_file}: {rows_inserted} lines")
+                seen_channels.add(channel_name)
+
+                channel_imported = sum(row_count for _, row_count in counts)
+                if debug:
+                    for log_file, row_count in counts:
+                        print(f"    ✓ {log_file}: {row_count} lines")
+                elif counts:
+                    print(f"    ✓ {len(counts)} file(s): {channel_imported:,} lines")
+                total_imported += channel_imported
 
             except Exception as e:
-                print(f"    ✗ Error reading {log_file}: {e}")
+                print(f"    ✗ Error importing {channel_name}: {e} (channel rolled back)")
                 conn.rollback()
                 continue
 
+            finally:
+                if tsv_path:
+                    os.unlink(tsv_path)
+    finally:
+        cursor.execute('SET SESSION unique_checks = 1, foreign_key_checks = 1')
+
     return total_imported
 
 
 def main():
     parser = argparse.ArgumentParser(description='Import ZNC logs to MySQL database')
     parser.add_argument('--network', type=str, help='Import only specific network')
+    parser.add_argument('--debug', action='store_true', help='List every imported and skipped log file')
+    parser.add_argument('--no-strip', action='store_true',
+                        help='Store lines with IRC colors and formatting codes intact')
     parser.add_argument('--force', action='store_true', help='Force re-import of existing logs')
+    parser.add_argument('--build-indexes', action='store_true',
+                        help='Create missing composite indexes on log_entries (slow on large tables)')
+    parser.add_argument('--rebuild-fulltext', action='store_true',
+                        help='Replace the FULLTEXT index on content with the ngram one (slow on large tables)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processes parsing channels in parallel (default: CPU count, 1 disables)')
     args = parser.parse_args()
 
     if not os.path.exists(ZNC_BASE_PATH):
@@ -235,37 +666,56 @@ def main():
         print(f"Error connecting to MySQL: {e}")
         sys.exit(1)
 
-    init_db()
+    # Loading into an empty table is faster without secondary indexes to
+    # maintain: drop the redundant ones now and build the rest once after
+    # the import instead
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM log_entries LIMIT 1')
+    defer_indexes = cursor.fetchone() is None
+    if defer_indexes:
+        drop_redundant_indexes(cursor, drop_fulltext=True, include_planned=True)
+
+    init_db(create_indexes=not defer_indexes, build_indexes=args.build_indexes,
+            build_fulltext=args.rebuild_fulltext)
 
     # Get networks to import
     if args.network:
         networks = [args.network]
     else:
-        networks = [d for d in os.listdir(ZNC_BASE_PATH)
-                    if os.path.isdir(os.path.join(ZNC_BASE_PATH, d))]
+        with os.scandir(ZNC_BASE_PATH) as it:
+            networks = [e.name for e in it if e.is_dir()]
 
     print(f"Scanning ZNC logs from: {ZNC_BASE_PATH}")
     print("=" * 70)
 
     total_imported = 0
-    for network_id in sorted(networks):
-        count = import_network(conn, network_id, args.force)
-        total_imported += count
-        print(f"  Network total: {count:,} lines\n")
+    # TSVs left behind by an interrupted run go away with the directory
+    with tempfile.TemporaryDirectory(prefix='znc_import_') as tmp_dir:
+        pool = multiprocessing.Pool(processes=args.workers) if args.workers > 1 else None
+        try:
+            for network_id in sorted(networks):
+                count = import_network(conn, network_id, args.force, pool,
+                                       strip_formatting=not args.no_strip, debug=args.debug,
+                                       tmp_dir=tmp_dir, jobs_ahead=args.workers + 1)
+                total_imported += count
+                print(f"  Network total: {count:,} lines\n")
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    if defer_indexes:
+        # Building indexes once over freshly loaded rows needs no opt-in
+        create_log_indexes(cursor, build_indexes=True, build_fulltext=True)
+
+    if total_imported:
+        clear_web_cache()
 
     # Stats
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM log_entries')
-    total_entries = cursor.fetchone()[0]
-
-    cursor.execute('SELECT COUNT(DISTINCT network_id) FROM log_entries')
-    network_count = cursor.fetchone()[0]
-
-    cursor.execute('SELECT COUNT(DISTINCT channel_name) FROM log_entries')
-    channel_count = cursor.fetchone()[0]
-
-    cursor.execute('SELECT MIN(log_date), MAX(log_date) FROM log_entries')
-    date_range = cursor.fetchone()
+    cursor.execute(
+        'SELECT COUNT(*), COUNT(DISTINCT network_id), COUNT(DISTINCT channel_name), '
+        'MIN(log_date), MAX(log_date) FROM log_entries'
+    )
+    total_entries, network_count, channel_count, *date_range = cursor.fetchone()
 
     conn.close()
 
@@ -13,10 +13,10 @@ Usage:
 
 import os
 import sys
-import hashlib
 from pysqlcipher3 import dbapi2 as sqlite
 from dotenv import load_dotenv
 import getpass
+from passwords import hash_password
 
 # Load environment variables from .env file
 load_dotenv()
@@ -30,10 +30,6 @@ if not DB_KEY:
     print("Error: DB_KEY not found in environment variables")
     sys.exit(1)
 
-def hash_password(password):
-    """Hash password using SHA256"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
 def get_db():
     """Get database connection with encryption"""
     if not os.path.exists(DB_PATH):
@@ -55,31 +51,12 @@ def migrate():
     
     try:
         conn = get_db()
-        cursor = conn.cursor()
-        
-        # Check if users table already exists
-        cursor.execute('''
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='users'
-        ''')
         
-        if cursor.fetchone():
-            print("⚠ Users table already exists. Checking for admin user...")
-            
-            cursor.execute('SELECT COUNT(*) FROM users WHERE username = ?', ('admin',))
-            if cursor.fetchone()[0] > 0:
-                print("✓ Admin user already exists.")
-                print("\nNo migration needed. Everything is already set up!")
-                conn.close()
-                return
-            else:
-                print("ℹ Users table exists but no admin user found. Creating admin user...")
-        else:
-            print("Creating users table...")
-            
-            # Create users table
-            cursor.execute('''
-                CREATE TABLE users (
+        # Both statements are no-ops when the table and admin user exist;
+        # "with conn" commits on success and rolls back on error
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     username TEXT UNIQUE NOT NULL,
                     password_hash TEXT NOT NULL,
@@ -90,20 +67,18 @@ def migrate():
                 )
             ''')
             
-            print("✓ Users table created successfully")
-        
-        # Create default admin user
-        print("\nCreating default admin user...")
-        default_password_hash = hash_password('admin')
-        
-        cursor.execute('''
-            INSERT INTO users (username, password_hash, totp_enabled) 
-            VALUES (?, ?, 0)
-        ''', ('admin', default_password_hash))
-        
-        conn.commit()
+            created = conn.execute('''
+                INSERT OR IGNORE INTO users (username, password_hash, totp_enabled) 
+                VALUES (?, ?, 0)
+            ''', ('admin', hash_password('admin'))).rowcount == 1
         conn.close()
         
+        if not created:
+            print("✓ Users table and admin user already exist.")
+            print("\nNo migration needed. Everything is already set up!")
+            return
+        
+        print("✓ Users table ready")
         print("✓ Default admin user created")
         print()
         print("=" * 70)
@@ -0,0 +1,48 @@
+"""
+Password hashing shared by the web app, the importer and the migration script
+"""
+
+import hashlib
+import hmac
+from functools import lru_cache
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+# Argon2id cost for new hashes; existing hashes made with other parameters
+# are upgraded on the next successful login
+password_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
+
+
+def hash_password(password):
+    """Hash password using Argon2id"""
+    return password_hasher.hash(password)
+
+
+def verify_password(password_hash, password):
+    """Check password against an Argon2 hash or a legacy unsalted SHA256 hex digest"""
+    if password_hash.startswith('$argon2'):
+        try:
+            return password_hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), password_hash)
+
+
+@lru_cache(maxsize=None)
+def dummy_password_hash():
+    """Return an Argon2 hash to verify against when no user matches
+
+    Verifying it costs the same as a real login, so response times do not
+    reveal which usernames exist.
+    """
+    return password_hasher.hash('dummy password')
+
+
+def password_needs_rehash(password_hash):
+    """Return True for legacy SHA256 hashes and outdated Argon2 parameters"""
+    if not password_hash.startswith('$argon2'):
+        return True
+    try:
+        return password_hasher.check_needs_rehash(password_hash)
+    except InvalidHashError:
+        return True
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for Gunicorn: gunicorn -k gthread -w 2 --threads 10 wsgi:app
+
+Each worker process has its own connection pool, so keep DB_POOL_SIZE at or
+above --threads plus a little slack; a streaming search holds its connection
+until the response is fully sent.
+"""
+
+from znc_search import app
@@ -3,21 +3,31 @@
 ZNC Log Search - Flask app with MySQL backend
 """
 
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for
+from flask import (Flask, Response, g, request, jsonify, render_template, session, redirect,
+                   send_file, stream_with_context, url_for)
+from flask_caching import Cache
 from flask_cors import CORS
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from flask_session import Session
 import os
 import re
 import sys
-import hashlib
-from functools import wraps
+import itertools
+import unicodedata
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache, wraps
 import mysql.connector
 from mysql.connector import pooling
 from dotenv import load_dotenv
 import getpass
+from passwords import hash_password, verify_password, password_needs_rehash, dummy_password_hash
 import pyotp
 import qrcode
 import io
-import base64
+import orjson
+import redis
 
 load_dotenv()
 
@@ -36,17 +46,75 @@ if not app.secret_key:
     print("Error: SECRET_KEY not found in environment variables")
     sys.exit(1)
 
-# Connection pool
+# Server-side sessions in Redis when configured, signed cookies otherwise
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    app.config.update(
+        SESSION_TYPE='redis',
+        SESSION_REDIS=redis.Redis.from_url(REDIS_URL),
+        SESSION_KEY_PREFIX='znc_search:session:',
+        SESSION_PERMANENT=False,
+    )
+    Session(app)
+
+# Cache for the network/channel/stats listings; shared across workers with Redis
+cache = Cache(app, config={
+    'CACHE_TYPE': 'RedisCache' if REDIS_URL else 'SimpleCache',
+    'CACHE_REDIS_URL': REDIS_URL,
+    'CACHE_KEY_PREFIX': 'znc_search:cache:',
+    'CACHE_DEFAULT_TIMEOUT': 60,
+})
+
+
+def login_rate_key():
+    """Rate-limit logins per username, or per client address without one
+
+    The username is folded the way utf8mb4_unicode_ci compares it (case,
+    accents and trailing spaces ignored), so every spelling that reaches
+    the same users row shares one counter.
+    """
+    data = request.get_json(silent=True) or {}
+    username = data.get('username')
+    if isinstance(username, str) and username.rstrip(' '):
+        decomposed = unicodedata.normalize('NFKD', username.rstrip(' '))
+        folded = ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+        return f'user:{folded}'
+    return get_remote_address()
+
+
+def login_failed(response):
+    """Only rejected credentials count towards the login limits"""
+    return response.status_code == 401
+
+
+limiter = Limiter(
+    get_remote_address,
+    app=app,
+    storage_uri=REDIS_URL or 'memory://',
+    key_prefix='znc_search:limit',
+)
+
+
+@app.errorhandler(429)
+def rate_limited(e):
+    return jsonify({'error': 'Too many attempts, please try again later'}), 429
+
+
+# Connection pool. Connections are returned without a session reset, so
+# autocommit keeps a reused connection from carrying an old read snapshot
 db_pool = pooling.MySQLConnectionPool(
     pool_name="znc_pool",
-    pool_size=5,
+    pool_size=int(os.getenv('DB_POOL_SIZE', 20)),
+    pool_reset_session=False,
+    autocommit=True,
     host=MYSQL_HOST,
     port=MYSQL_PORT,
     user=MYSQL_USER,
     password=MYSQL_PASSWORD,
     database=MYSQL_DATABASE,
     charset='utf8mb4',
-    collation='utf8mb4_unicode_ci'
+    collation='utf8mb4_unicode_ci',
+    use_pure=False
 )
 
 
@@ -55,28 +123,124 @@ def get_db():
     return db_pool.get_connection()
 
 
-def hash_password(password):
-    """Hash password using SHA256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+@contextmanager
+def db_cursor():
+    """Yield (cursor, conn) and always hand the connection back to the pool"""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        yield cursor, conn
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@lru_cache(maxsize=None)
+def ngram_term_re():
+    """Match a word-character run long enough to produce an ngram token
+
+    The ngram parser splits on non-word characters and skips runs shorter
+    than the server's ngram_token_size, which is read once per process.
+    """
+    with db_cursor() as (cursor, conn):
+        cursor.execute('SELECT @@ngram_token_size')
+        token_size = int(cursor.fetchone()[0])
+    return re.compile(r'\w{%d}' % token_size)
+
+
+@lru_cache(maxsize=None)
+def has_ngram_index():
+    """Return True if log_entries carries the importer's ngram FULLTEXT index
+
+    Until import_logs.py --rebuild-fulltext builds it, MATCH runs on the
+    old word-parser index, which cannot see phrases or partial words. The
+    check runs once per process, so restart the app after the rebuild.
+    """
+    with db_cursor() as (cursor, conn):
+        cursor.execute(
+            'SELECT 1 FROM information_schema.statistics '
+            'WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s '
+            'LIMIT 1',
+            ('log_entries', 'ft_content_ngram')
+        )
+        return cursor.fetchone() is not None
+
+
+def ojsonify(obj):
+    """jsonify() via orjson, which also serializes dates as YYYY-MM-DD"""
+    return Response(orjson.dumps(obj), mimetype='application/json')
+
+
+def _build_search_sql(use_fulltext, has_channel, has_start, has_end):
+    sql = '''
+        SELECT 
+            le.network_id,
+            n.display_name,
+            le.channel_name,
+            DATE_FORMAT(le.log_date, '%Y-%m-%d'),
+            le.line_number,
+            le.content
+        FROM log_entries le
+        JOIN networks n ON le.network_id = n.id
+        WHERE le.network_id = %s
+    '''
+    if use_fulltext:
+        # The ngram index narrows the rows, LIKE keeps exact substring semantics
+        sql += ' AND MATCH(le.content) AGAINST (%s IN BOOLEAN MODE)'
+    sql += ' AND le.content LIKE %s'
+    if has_channel:
+        sql += ' AND le.channel_name = %s'
+    if has_start:
+        sql += ' AND le.log_date >= %s'
+    if has_end:
+        sql += ' AND le.log_date <= %s'
+    return sql + ' ORDER BY le.log_date DESC, le.line_number ASC LIMIT 1000'
+
+
+# A single plain word, searched as an ngram term rather than a phrase
+_WORD_RE = re.compile(r'\A\w+\Z')
+
+# Field names of the search result rows, in SELECT order
+SEARCH_COLUMNS = ('network_id', 'network', 'channel', 'date', 'line', 'content')
+
+# Search SQL keyed by (use_fulltext, has_channel, has_start, has_end)
+_SEARCH_SQL = {
+    shape: _build_search_sql(*shape)
+    for shape in itertools.product((False, True), repeat=4)
+}
 
 
 def init_db():
     """Create default admin user if not exists"""
-    conn = get_db()
-    cursor = conn.cursor()
+    with db_cursor() as (cursor, conn):
+        cursor.execute(
+            'INSERT IGNORE INTO users (username, password_hash, totp_enabled) VALUES (%s, %s, 0)',
+            ('admin', hash_password('admin'))
+        )
+        if cursor.rowcount:
+            conn.commit()
+            print("WARNING: Default admin user created with password 'admin'. Please change it immediately!")
+
+
+User = namedtuple('User', 'id username password_hash totp_secret totp_enabled')
+
 
-    cursor.execute('SELECT COUNT(*) FROM users WHERE username = %s', ('admin',))
-    if cursor.fetchone()[0] == 0:
-        default_hash = hash_password('admin')
+def _load_user(user_id):
+    """Fetch a user row, or None if it no longer exists"""
+    with db_cursor() as (cursor, conn):
         cursor.execute(
-            'INSERT INTO users (username, password_hash, totp_enabled) VALUES (%s, %s, 0)',
-            ('admin', default_hash)
+            'SELECT id, username, password_hash, totp_secret, totp_enabled FROM users WHERE id = %s',
+            (user_id,)
         )
-        conn.commit()
-        print("WARNING: Default admin user created with password 'admin'. Please change it immediately!")
+        row = cursor.fetchone()
+    return User(*row) if row else None
+
 
-    cursor.close()
-    conn.close()
+def current_user():
+    """The logged-in user, loaded at most once per request"""
+    if g.get('user') is None:
+        g.user = _load_user(session['user_id'])
+    return g.user
 
 
 def login_required(f):
@@ -105,6 +269,8 @@ def login_page():
 
 
 @app.route('/api/login', methods=['POST'])
+@limiter.limit('10/minute;100/hour', key_func=login_rate_key, deduct_when=login_failed)
+@limiter.limit('30/minute;300/hour', deduct_when=login_failed)
 def login():
     data = request.json
     username = data.get('username')
@@ -114,24 +280,21 @@ def login():
     if not username or not password:
         return jsonify({'error': 'Username and password required'}), 400
 
-    conn = get_db()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        'SELECT id, username, password_hash, totp_secret, totp_enabled '
-        'FROM users WHERE username = %s',
-        (username,)
-    )
-    user = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with db_cursor() as (cursor, conn):
+        cursor.execute(
+            'SELECT id, username, password_hash, totp_secret, totp_enabled '
+            'FROM users WHERE username = %s',
+            (username,)
+        )
+        user = cursor.fetchone()
 
     if not user:
+        verify_password(dummy_password_hash(), password)
         return jsonify({'error': 'Invalid credentials'}), 401
 
     user_id, username, password_hash, totp_secret, totp_enabled = user
 
-    if hash_password(password) != password_hash:
+    if not verify_password(password_hash, password):
         return jsonify({'error': 'Invalid credentials'}), 401
 
     if totp_enabled:
@@ -141,6 +304,15 @@ def login():
         if not totp.verify(totp_code, valid_window=1):
             return jsonify({'error': 'Invalid 2FA code'}), 401
 
+    # The plaintext is only known here, so migrate old hashes on login
+    if password_needs_rehash(password_hash):
+        with db_cursor() as (cursor, conn):
+            cursor.execute(
+                'UPDATE users SET password_hash = %s WHERE id = %s',
+                (hash_password(password), user_id)
+            )
+            conn.commit()
+
     session['logged_in'] = True
     session['username'] = username
     session['user_id'] = user_id
@@ -159,17 +331,11 @@ def logout():
 @app.route('/api/user/info', methods=['GET'])
 @login_required
 def get_user_info():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT username, totp_enabled FROM users WHERE id = %s', (session['user_id'],))
-    result = cursor.fetchone()
-    cursor.close()
-    conn.close()
-
-    if not result:
+    user = current_user()
+    if not user:
         return jsonify({'error': 'User not found'}), 404
 
-    return jsonify({'username': result[0], 'two_factor_enabled': bool(result[1])})
+    return jsonify({'username': user.username, 'two_factor_enabled': bool(user.totp_enabled)})
 
 
 @app.route('/api/user/password', methods=['POST'])
@@ -185,23 +351,17 @@ def change_password():
     if len(new_password) < 8:
         return jsonify({'error': 'New password must be at least 8 characters'}), 400
 
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT password_hash FROM users WHERE id = %s', (session['user_id'],))
-    user = cursor.fetchone()
-
-    if not user or hash_password(current_password) != user[0]:
-        cursor.close()
-        conn.close()
+    user = current_user()
+    if not user or not verify_password(user.password_hash, current_password):
         return jsonify({'error': 'Current password is incorrect'}), 401
 
-    cursor.execute(
-        'UPDATE users SET password_hash = %s WHERE id = %s',
-        (hash_password(new_password), session['user_id'])
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with db_cursor() as (cursor, conn):
+        cursor.execute(
+            'UPDATE users SET password_hash = %s WHERE id = %s',
+            (hash_password(new_password), user.id)
+        )
+        conn.commit()
+    g.user = None
 
     return jsonify({'success': True, 'message': 'Password changed successfully'})
 
@@ -209,42 +369,50 @@ def change_password():
 @app.route('/api/user/2fa/status', methods=['GET'])
 @login_required
 def get_2fa_status():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT totp_enabled FROM users WHERE id = %s', (session['user_id'],))
-    result = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return jsonify({'enabled': bool(result[0]) if result else False})
+    user = current_user()
+    return jsonify({'enabled': bool(user.totp_enabled) if user else False})
 
 
 @app.route('/api/user/2fa/setup', methods=['POST'])
 @login_required
 def setup_2fa():
     secret = pyotp.random_base32()
+    username = current_user().username
 
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        'UPDATE users SET totp_secret = %s WHERE id = %s',
-        (secret, session['user_id'])
-    )
-    conn.commit()
-    cursor.execute('SELECT username FROM users WHERE id = %s', (session['user_id'],))
-    username = cursor.fetchone()[0]
-    cursor.close()
-    conn.close()
+    with db_cursor() as (cursor, conn):
+        cursor.execute(
+            'UPDATE users SET totp_secret = %s WHERE id = %s',
+            (secret, session['user_id'])
+        )
+        conn.commit()
+    g.user = None
 
     totp_uri = pyotp.totp.TOTP(secret).provisioning_uri(name=username, issuer_name='IRC Log Search')
+    return jsonify({'secret': secret, 'otpauth_uri': totp_uri, 'manual_entry': secret})
+
+
+@app.route('/api/user/2fa/qr', methods=['GET'])
+@login_required
+def get_2fa_qr():
+    user = current_user()
+    # The secret is only shown while setup is pending, never for a live 2FA
+    if not user or not user.totp_secret or user.totp_enabled:
+        return jsonify({'error': 'Please setup 2FA first'}), 404
+
+    totp_uri = pyotp.totp.TOTP(user.totp_secret).provisioning_uri(
+        name=user.username, issuer_name='IRC Log Search'
+    )
     qr = qrcode.QRCode(version=1, box_size=10, border=5)
     qr.add_data(totp_uri)
     qr.make(fit=True)
     img = qr.make_image(fill_color="black", back_color="white")
     buffer = io.BytesIO()
     img.save(buffer, format='PNG')
-    img_str = base64.b64encode(buffer.getvalue()).decode()
+    buffer.seek(0)
 
-    return jsonify({'secret': secret, 'qr_code': f'data:image/png;base64,{img_str}', 'manual_entry': secret})
+    response = send_file(buffer, mimetype='image/png')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 
 @app.route('/api/user/2fa/enable', methods=['POST'])
@@ -256,25 +424,17 @@ def enable_2fa():
     if not totp_code:
         return jsonify({'error': 'Verification code required'}), 400
 
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT totp_secret FROM users WHERE id = %s', (session['user_id'],))
-    result = cursor.fetchone()
-
-    if not result or not result[0]:
-        cursor.close()
-        conn.close()
+    user = current_user()
+    if not user or not user.totp_secret:
         return jsonify({'error': 'Please setup 2FA first'}), 400
 
-    if not pyotp.TOTP(result[0]).verify(totp_code, valid_window=1):
-        cursor.close()
-        conn.close()
+    if not pyotp.TOTP(user.totp_secret).verify(totp_code, valid_window=1):
         return jsonify({'error': 'Invalid verification code'}), 401
 
-    cursor.execute('UPDATE users SET totp_enabled = 1 WHERE id = %s', (session['user_id'],))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with db_cursor() as (cursor, conn):
+        cursor.execute('UPDATE users SET totp_enabled = 1 WHERE id = %s', (user.id,))
+        conn.commit()
+    g.user = None
 
     return jsonify({'success': True, 'message': '2FA enabled successfully'})
 
@@ -288,23 +448,17 @@ def disable_2fa():
     if not password:
         return jsonify({'error': 'Password required'}), 400
 
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT password_hash FROM users WHERE id = %s', (session['user_id'],))
-    result = cursor.fetchone()
-
-    if not result or hash_password(password) != result[0]:
-        cursor.close()
-        conn.close()
+    user = current_user()
+    if not user or not verify_password(user.password_hash, password):
         return jsonify({'error': 'Invalid password'}), 401
 
-    cursor.execute(
-        'UPDATE users SET totp_enabled = 0, totp_secret = NULL WHERE id = %s',
-        (session['user_id'],)
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with db_cursor() as (cursor, conn):
+        cursor.execute(
+            'UPDATE users SET totp_enabled = 0, totp_secret = NULL WHERE id = %s',
+            (user.id,)
+        )
+        conn.commit()
+    g.user = None
 
     return jsonify({'success': True, 'message': '2FA disabled successfully'})
 
@@ -313,36 +467,32 @@ def disable_2fa():
 
 @app.route('/api/networks', methods=['GET'])
 @login_required
+@cache.cached(timeout=60, key_prefix='networks_v1')
 def get_networks():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT DISTINCT n.id, n.display_name 
-        FROM networks n
-        INNER JOIN log_entries le ON n.id = le.network_id
-        ORDER BY n.display_name
-    ''')
-    networks = [{'id': row[0], 'name': row[1]} for row in cursor.fetchall()]
-    cursor.close()
-    conn.close()
-    return jsonify({'networks': networks})
+    with db_cursor() as (cursor, conn):
+        cursor.execute('''
+            SELECT n.id, n.display_name
+            FROM networks n
+            WHERE EXISTS (SELECT 1 FROM log_entries le WHERE le.network_id = n.id)
+            ORDER BY n.display_name
+        ''')
+        networks = [{'id': row[0], 'name': row[1]} for row in cursor.fetchall()]
+    return ojsonify({'networks': networks})
 
 
 @app.route('/api/channels/<network>', methods=['GET'])
 @login_required
+@cache.memoize(timeout=60)
 def get_channels(network):
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT DISTINCT channel_name 
-        FROM log_entries 
-        WHERE network_id = %s AND channel_name LIKE '#%%'
-        ORDER BY channel_name
-    ''', (network,))
-    channels = [row[0] for row in cursor.fetchall()]
-    cursor.close()
-    conn.close()
-    return jsonify({'channels': channels})
+    with db_cursor() as (cursor, conn):
+        cursor.execute('''
+            SELECT DISTINCT channel_name 
+            FROM log_entries 
+            WHERE network_id = %s AND channel_name LIKE '#%%'
+            ORDER BY channel_name
+        ''', (network,))
+        channels = [row[0] for row in cursor.fetchall()]
+    return ojsonify({'channels': channels})
 
 
 @app.route('/api/search', methods=['POST'])
@@ -360,79 +510,61 @@ def search_logs():
     if not network:
         return jsonify({'error': 'Network required'}), 400
 
-    conn = get_db()
-    cursor = conn.cursor()
-
-    # Single plain word → FULLTEXT (fast, indexed).
-    # Phrases, URLs, sentences, special chars → LIKE (exact substring).
-    use_fulltext = bool(re.match(r'^\w+$', query))
-
-    if use_fulltext:
-        sql = '''
-            SELECT 
-                le.network_id,
-                n.display_name,
-                le.channel_name,
-                le.log_date,
-                le.line_number,
-                le.content
-            FROM log_entries le
-            JOIN networks n ON le.network_id = n.id
-            WHERE le.network_id = %s
-            AND MATCH(le.content) AGAINST (%s IN BOOLEAN MODE)
-        '''
-        params = [network, query]
+    # Single plain word → ngram term.
+    # Phrases, URLs, sentences, special chars → quoted ngram phrase.
+    # Either way LIKE filters the FULLTEXT candidates down to exact substrings;
+    # queries without a word run the ngram index can see (C++, I/O, x.y)
+    # fall back to LIKE alone. Without the ngram index only single words
+    # go through MATCH, as the word parser cannot match anything else.
+    if _WORD_RE.match(query):
+        match_term = query
     else:
-        sql = '''
-            SELECT 
-                le.network_id,
-                n.display_name,
-                le.channel_name,
-                le.log_date,
-                le.line_number,
-                le.content
-            FROM log_entries le
-            JOIN networks n ON le.network_id = n.id
-            WHERE le.network_id = %s
-            AND le.content LIKE %s
-        '''
-        params = [network, f'%{query}%']
+        match_term = '"' + query.replace('"', ' ') + '"'
+    if has_ngram_index():
+        use_fulltext = bool(ngram_term_re().search(query))
+    else:
+        use_fulltext = bool(_WORD_RE.match(query))
 
+    params = [network, match_term] if use_fulltext else [network]
+    params.append(f'%{query}%')
     if channel:
-        sql += ' AND le.channel_name = %s'
         params.append(channel)
-
     if start_date:
-        sql += ' AND le.log_date >= %s'
         params.append(start_date)
-
     if end_date:
-        sql += ' AND le.log_date <= %s'
         params.append(end_date)
 
-    sql += ' ORDER BY le.log_date DESC, le.line_number ASC LIMIT 1000'
-
-    cursor.execute(sql, params)
+    sql = _SEARCH_SQL[use_fulltext, bool(channel), bool(start_date), bool(end_date)]
 
-    results = []
-    for row in cursor.fetchall():
-        results.append({
-            'network_id': row[0],
-            'network': row[1],
-            'channel': row[2],
-            'date': str(row[3]),
-            'line': row[4],
-            'content': row[5]
-        })
-
-    cursor.close()
-    conn.close()
-
-    return jsonify({
-        'results': results,
-        'total': len(results),
-        'truncated': len(results) >= 1000
-    })
+    # The response generator owns the connection once execute() succeeds
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+    except Exception:
+        cursor.close()
+        conn.close()
+        raise
+
+    def generate():
+        # Stream rows out as they arrive instead of building the whole list
+        try:
+            total = 0
+            yield b'{"columns":%s,"rows":[' % orjson.dumps(SEARCH_COLUMNS)
+            while True:
+                rows = cursor.fetchmany(200)
+                if not rows:
+                    break
+                # Each batch is dumped as one array, minus its brackets
+                yield (b',' if total else b'') + orjson.dumps(rows)[1:-1]
+                total += len(rows)
+            yield b'],"total":%d,"truncated":%s}' % (total, orjson.dumps(total >= 1000))
+        finally:
+            conn.consume_results()
+            cursor.close()
+            conn.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 
 @app.route('/api/context', methods=['POST'])
@@ -449,35 +581,32 @@ def get_context():
     if not all([network, channel, log_date, center_line]):
         return jsonify({'error': 'Missing required parameters'}), 400
 
-    conn = get_db()
-    cursor = conn.cursor()
-
     start_line = max(1, center_line - lines_before)
     end_line = center_line + lines_after
 
-    cursor.execute('''
-        SELECT line_number, content
-        FROM log_entries
-        WHERE network_id = %s AND channel_name = %s AND log_date = %s
-        AND line_number BETWEEN %s AND %s
-        ORDER BY line_number
-    ''', (network, channel, log_date, start_line, end_line))
-
+    with db_cursor() as (cursor, conn):
+        # Day line count and the context window in one round trip; the LEFT JOIN
+        # keeps the count row even when no lines fall inside the window
+        cursor.execute('''
+            SELECT t.total, le.line_number, le.content
+            FROM (
+                SELECT COUNT(*) AS total FROM log_entries
+                WHERE network_id = %s AND channel_name = %s AND log_date = %s
+            ) t
+            LEFT JOIN log_entries le
+                ON le.network_id = %s AND le.channel_name = %s AND le.log_date = %s
+                AND le.line_number BETWEEN %s AND %s
+            ORDER BY le.line_number
+        ''', (network, channel, log_date, network, channel, log_date, start_line, end_line))
+        rows = cursor.fetchall()
+
+    total_lines = rows[0][0]
     context = [
-        {'line': row[0], 'content': row[1], 'is_match': row[0] == center_line}
-        for row in cursor.fetchall()
+        {'line': row[1], 'content': row[2], 'is_match': row[1] == center_line}
+        for row in rows if row[1] is not None
     ]
 
-    cursor.execute('''
-        SELECT COUNT(*) FROM log_entries
-        WHERE network_id = %s AND channel_name = %s AND log_date = %s
-    ''', (network, channel, log_date))
-    total_lines = cursor.fetchone()[0]
-
-    cursor.close()
-    conn.close()
-
-    return jsonify({
+    return ojsonify({
         'context': context,
         'start_line': start_line,
         'end_line': end_line,
@@ -489,44 +618,60 @@ def get_context():
 
 @app.route('/api/stats', methods=['GET'])
 @login_required
+@cache.cached(timeout=30, key_prefix='stats_v1')
 def get_stats():
-    conn = get_db()
-    cursor = conn.cursor()
+    with db_cursor() as (cursor, conn):
+        cursor.execute('''
+            SELECT
+                (SELECT COUNT(*) FROM log_entries),
+                (SELECT MIN(log_date) FROM log_entries),
+                (SELECT MAX(log_date) FROM log_entries),
+                (SELECT COUNT(DISTINCT network_id) FROM log_entries),
+                (SELECT COUNT(DISTINCT channel_name) FROM log_entries WHERE channel_name LIKE '#%')
+        ''')
+        total_entries, *date_range, network_count, channel_count = cursor.fetchone()
+
+        cursor.execute('''
+            SELECT n.display_name, COUNT(*) 
+            FROM log_entries le
+            JOIN networks n ON le.network_id = n.id
+            GROUP BY n.display_name
+            ORDER BY COUNT(*) DESC
+        ''')
+        network_stats = [{'network': row[0], 'count': row[1]} for row in cursor.fetchall()]
 
-    cursor.execute('SELECT COUNT(*) FROM log_entries')
-    total_entries = cursor.fetchone()[0]
+    return ojsonify({
+        'total_entries': total_entries,
+        'network_count': network_count,
+        'channel_count': channel_count,
+        'date_range': {'start': date_range[0], 'end': date_range[1]},
+        'networks': network_stats
+    })
 
-    cursor.execute('SELECT MIN(log_date), MAX(log_date) FROM log_entries')
-    date_range = cursor.fetchone()
 
-    cursor.execute('SELECT COUNT(DISTINCT network_id) FROM log_entries')
-    network_count = cursor.fetchone()[0]
+def invalidate_log_caches(network=None):
+    """Drop cached listings after new log rows have been imported"""
+    cache.delete('networks_v1')
+    cache.delete('stats_v1')
+    if network is None:
+        cache.delete_memoized(get_channels)
+    else:
+        cache.delete_memoized(get_channels, network)
 
-    cursor.execute("SELECT COUNT(DISTINCT channel_name) FROM log_entries WHERE channel_name LIKE '#%'")
-    channel_count = cursor.fetchone()[0]
 
-    cursor.execute('''
-        SELECT n.display_name, COUNT(*) 
-        FROM log_entries le
-        JOIN networks n ON le.network_id = n.id
-        GROUP BY n.display_name
-        ORDER BY COUNT(*) DESC
-    ''')
-    network_stats = [{'network': row[0], 'count': row[1]} for row in cursor.fetchall()]
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the default admin user if it does not exist"""
+    init_db()
 
-    cursor.close()
-    conn.close()
 
-    return jsonify({
-        'total_entries': total_entries,
-        'network_count': network_count,
-        'channel_count': channel_count,
-        'date_range': {'start': str(date_range[0]) if date_range[0] else None,
-                       'end': str(date_range[1]) if date_range[1] else None},
-        'networks': network_stats
-    })
+@app.cli.command('clear-cache')
+def clear_cache_command():
+    """Clear cached network, channel and stats listings"""
+    invalidate_log_caches()
+    print("✓ Log caches cleared")
 
 
+# Development server only; production runs under Gunicorn via wsgi.py
 if __name__ == '__main__':
-    init_db()
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file